@@ -1,25 +1,150 @@
+import array
+import asyncio
+import bisect
+import collections
+import concurrent.futures
+import functools
+import itertools
 import json
+import logging
+import logging.handlers
+import operator
+import queue
+import random
+import re
+import string
 from dataclasses import dataclass, field
-from datetime import datetime, timedelta
+from datetime import datetime
 import threading
 import time
-from typing import Dict, List
+from typing import Dict, List, Set
 import ssl
+import socket
 import os
+from pathlib import Path
 import sys
 
-try:
+# tkinter y websockets se importan en el primer uso: quien solo importa el módulo
+# (p. ej. parse_signal en un backtest) no paga su coste de arranque.
+tk = ttk = messagebox = None
+websockets = ws_connect = None
+
+@functools.cache
+def _tk():
+    """Import tkinter on first use and bind it at module level; raises ImportError if missing."""
+    global tk, ttk, messagebox
     import tkinter as tk
     from tkinter import ttk, messagebox
-except ImportError:
-    tk = None  # for environments without tkinter
+    return tk, ttk, messagebox
+
+@functools.cache
+def _ws():
+    """Import websockets on first use and bind it at module level; raises ImportError if missing."""
+    global websockets, ws_connect
+    import websockets
+    from websockets.asyncio.client import connect as ws_connect
+    return websockets, ws_connect
+
+@functools.cache
+def _deflate_factory():
+    """permessage-deflate for the client that leaves small outgoing messages uncompressed."""
+    from websockets.extensions import permessage_deflate as pmd
+
+    class SizedPerMessageDeflate(pmd.PerMessageDeflate):
+        def encode(self, frame):
+            # La compresión es opcional por mensaje (bit RSV1): las órdenes cortas
+            # salen tal cual y solo se comprime lo que compensa.
+            if frame.fin and frame.opcode is not pmd.CONT and len(frame.data) < DEFLATE_MIN_SIZE:
+                return frame
+            return super().encode(frame)
+
+    class SizedDeflateFactory(pmd.ClientPerMessageDeflateFactory):
+        def process_response_params(self, params, accepted_extensions):
+            # La negociación la hace websockets; con sus parámetros se construye la
+            # variante por tamaño a través del constructor público.
+            negotiated = super().process_response_params(params, accepted_extensions)
+            return SizedPerMessageDeflate(
+                negotiated.remote_no_context_takeover,
+                negotiated.local_no_context_takeover,
+                negotiated.remote_max_window_bits,
+                negotiated.local_max_window_bits,
+                negotiated.compress_settings,
+            )
+
+    return SizedDeflateFactory(compress_settings={"memLevel": 5})
 
 try:
-    import websocket
+    import orjson
 except ImportError:
-    websocket = None
-
-@dataclass
+    orjson = None
+
+# JSON como bytes: orjson si está disponible (mucho más rápido), json estándar si no.
+if orjson is not None:
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+else:
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode()
+    _json_loads = json.loads
+
+log = logging.getLogger("deriv_bot")
+
+# Tramas de forma fija precodificadas; solo se interpola el id que varía.
+_SUBSCRIBE_FRAME = b'{"proposal_open_contract":1,"contract_id":%d,"subscribe":1}'
+_FORGET_FRAME = b'{"forget":%b}'
+_FORGET_ALL_FRAME = b'{"forget_all":%b}'
+
+# Actualizaciones de contrato abierto: llegan en cada tick y solo importa la final.
+_POC_UPDATE_RE = re.compile(rb'"msg_type"\s*:\s*"proposal_open_contract"')
+_IS_SOLD_RE = re.compile(rb'"is_sold"\s*:\s*(?:1|true)')
+# Ids con su clave: un número suelto en el mensaje (precio, epoch...) no se confunde con ellos.
+_REQ_ID_RE = re.compile(rb'"req_id"\s*:\s*(\d+)')
+_CONTRACT_ID_RE = re.compile(rb'"contract_id"\s*:\s*(\d+)')
+
+# Intervalo (ms) con que la UI vuelca la salida acumulada y líneas máximas de la consola.
+CONSOLE_PUMP_MS = 200
+CONSOLE_MAX_LINES = 1000
+# Escrituras pendientes como máximo entre volcados; las más antiguas se descartan.
+CONSOLE_BUFFER_MAX = 5000
+
+# Segundos sin uso tras los que la UI cierra una conexión cacheada y cada cuánto (ms) lo revisa.
+API_IDLE_TIMEOUT = 10 * 60
+API_SWEEP_MS = 60_000
+
+# Conexiones autorizadas adicionales por las que se reparten las compras.
+BUY_POOL_SIZE = 4
+
+# Paso máximo (s) del temporizador de señales: el reloj se relee en cada paso,
+# así el error no se acumula aunque sleep() despierte tarde.
+SCHEDULE_TICK = 0.333
+# Espera máxima (s) al cerrar la ventana para que las conexiones se cierren limpiamente.
+API_CLOSE_TIMEOUT = 2
+
+# Mensajes salientes más cortos que esto (bytes) no se comprimen aunque se negocie deflate.
+DEFLATE_MIN_SIZE = 512
+
+# Latido de cada conexión: PING de protocolo cada HEARTBEAT_INTERVAL s y reconexión
+# si el pong tarda más de HEARTBEAT_TIMEOUT s.
+HEARTBEAT_INTERVAL = 30
+HEARTBEAT_TIMEOUT = 10
+
+# Backoff exponencial truncado con jitter para las reconexiones (segundos).
+BACKOFF_INITIAL = 5
+BACKOFF_MIN = 1.92
+BACKOFF_FACTOR = 1.618
+BACKOFF_MAX = 60
+# Intentos de reconexión seguidos antes de dar la conexión por perdida (None = sin límite).
+MAX_RECONNECT_ATTEMPTS = 10
+
+def _backoff_delays():
+    """Yield reconnect delays: a random first wait, then exponential growth up to BACKOFF_MAX."""
+    yield random.uniform(0, BACKOFF_INITIAL)
+    delay = BACKOFF_MIN
+    while True:
+        yield delay
+        delay = min(delay * BACKOFF_FACTOR, BACKOFF_MAX)
+
+@dataclass(slots=True)
 class Signal:
     time: datetime
     symbol: str
@@ -29,70 +154,294 @@ class Signal:
     stop_loss: float = 0.0
     martingale: bool = False
     use_global: bool = False
+    # Duración en minutos extraída de timeframe ("M5" -> 5) una sola vez.
+    duration_min: int = 0
+    # Fecha y hora ya formateadas para la tabla (evita strftime por fila).
+    date_str: str = field(default="", repr=False)
+    time_str: str = field(default="", repr=False)
+    # Trama de compra precodificada; solo se formatean amount y req_id por trade.
+    buy_template: bytes = field(default=None, repr=False, compare=False)
+    # Instante de disparo en el reloj monotónico, fijado por DerivBot.add_signal.
+    deadline: float = field(default=0.0, repr=False, compare=False)
+    # True en cuanto el planificador la dispara: un nuevo arranque con la misma tabla no la repite.
+    fired: bool = field(default=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        if not self.duration_min:
+            self.duration_min = int(self.timeframe[1:])
 
 class DerivAPI:
-    def __init__(self, token: str, app_id: str = "1089"):
+    def __init__(self, token: str, app_id: str = "1089", pool_size: int = BUY_POOL_SIZE,
+                 max_reconnect_attempts: int = None):
         self.token = token
+        # Trama de autorización fija por token: se serializa una sola vez.
+        self._authorize_frame = _json_dumps({"authorize": token})
+        # None = reintentar indefinidamente.
+        self.max_reconnect_attempts = max_reconnect_attempts
         self.url = f"wss://ws.binaryws.com/websockets/v3?app_id={app_id}"
         self.ws = None
-
-    def safe_send(self, message: dict):
-        """Send a message and reconnect on failure."""
+        # self.ws lleva suscripciones y peticiones generales; las compras se
+        # reparten en round-robin entre las conexiones del pool.
+        self.pool_size = pool_size
+        self._pool: List = []
+        self._pool_readers: List[asyncio.Task] = []
+        self._pool_rr = itertools.count()
+        self._req_ids = itertools.count(1)
+        self._req_futures: Dict[int, asyncio.Future] = {}
+        self._contract_queues: Dict[int, asyncio.Queue] = {}
+        self._send_queue: asyncio.Queue = asyncio.Queue()
+        self._reader = None
+        self._writer = None
+        self._connect_lock = asyncio.Lock()
+
+    async def send_frame(self, frame: bytes):
+        """Queue an already encoded frame for the writer task."""
         if self.ws is None:
-            self.connect()
+            await self.connect()
+        self._send_queue.put_nowait(frame)
+
+    async def _send_now(self, data: bytes):
+        """Send a pre-encoded frame immediately and reconnect on failure."""
+        ws = self.ws
+        self._quickack(ws)
         try:
-            self.ws.send(json.dumps(message))
-        except (websocket.WebSocketConnectionClosedException, ssl.SSLError, ConnectionResetError):
-            print("WebSocket cerrado. Reconectando...")
-            self.connect()
-            self.ws.send(json.dumps(message))
-
-    def connect(self):
-        if websocket is None:
-            raise RuntimeError("websocket-client is required")
-        self.ws = websocket.WebSocket()
-        self.ws.connect(self.url)
-        self.safe_send({"authorize": self.token})
-        resp = json.loads(self.ws.recv())
+            await ws.send(data, text=True)
+        except (websockets.exceptions.ConnectionClosed, ssl.SSLError, ConnectionResetError):
+            log.warning("WebSocket cerrado. Reconectando...")
+            await self._reconnect(ws)
+            await self.ws.send(data, text=True)
+
+    async def _write_loop(self):
+        """Send queued requests in order as soon as they arrive."""
+        # Deriv no acepta arrays y cada ws.send es su propia escritura: esperar para
+        # agrupar no ahorra nada en el cable, solo añade latencia.
+        queue = self._send_queue
+        while True:
+            frame = await queue.get()
+            try:
+                await self._send_now(frame)
+            except Exception as e:
+                log.error("❌ Error al enviar %s: %s", frame, e)
+
+    async def connect(self):
+        """Open an authorized connection (once) and start the background tasks."""
+        # Todo bajo el lock: dos connect() simultáneos (precalentado de la UI y
+        # run_async) no deben abrir dos pools ni lanzar lectores duplicados.
+        async with self._connect_lock:
+            if self.ws is None:
+                await self._open()
+            # Sin lectores vivos el pool no existe o se abandonó: se abre de nuevo.
+            if self.pool_size > 0 and all(t.done() for t in self._pool_readers):
+                await self._open_pool()
+            if self._reader is None or self._reader.done():
+                self._reader = asyncio.create_task(self._read_loop())
+            if self._writer is None or self._writer.done():
+                self._writer = asyncio.create_task(self._write_loop())
+
+    async def _connect_one(self):
+        """Open, tune and authorize a single connection."""
+        try:
+            _ws()
+        except ImportError:
+            raise RuntimeError("websockets is required") from None
+        # permessage-deflate solo para lo que compensa: las actualizaciones de contrato
+        # entrantes llegan comprimidas y las órdenes salientes cortas van sin comprimir.
+        # Latido con PING de protocolo (opcode 0x9) gestionado por websockets: sin pong
+        # en HEARTBEAT_TIMEOUT cierra la conexión y el lector reconecta.
+        ws = await ws_connect(self.url, ping_interval=HEARTBEAT_INTERVAL,
+                              ping_timeout=HEARTBEAT_TIMEOUT,
+                              compression=None, extensions=[_deflate_factory()])
+        self._tune_socket(ws)
+        await ws.send(self._authorize_frame, text=True)
+        resp = _json_loads(await ws.recv(decode=False))
         if resp.get("error"):
+            await ws.close()
             raise RuntimeError(resp["error"]["message"])
-        
-        
-    def recv(self):
-        """Recibe un mensaje del websocket con reconexión si hay fallas."""
-        if self.ws is None:
-            self.connect()
-        try:
-            return json.loads(self.ws.recv())
-        except (websocket.WebSocketConnectionClosedException, ssl.SSLError, ConnectionResetError) as e:
-            print(f"⚠️ WebSocket desconectado durante recv(). Reintentando conexión... ({e})")
-            self.connect()
+        return ws
+
+    async def _open(self):
+        self.ws = await self._connect_one()
+
+    async def _open_pool(self):
+        """Open the buy connections in parallel; without them buys use self.ws."""
+        results = await asyncio.gather(
+            *(self._connect_one() for _ in range(self.pool_size)), return_exceptions=True
+        )
+        self._pool = [ws for ws in results if not isinstance(ws, BaseException)]
+        if len(self._pool) < self.pool_size:
+            log.warning("⚠️ Solo se abrieron %d/%d conexiones de compra.", len(self._pool), self.pool_size)
+        # Se acumulan en vez de reemplazarse: close() cancela todos los que se crearon.
+        self._pool_readers.extend(
+            asyncio.create_task(self._pool_read_loop(i)) for i in range(len(self._pool))
+        )
+
+    @staticmethod
+    def _tune_socket(ws):
+        """Disable Nagle, enable TCP keepalive and size the socket buffers."""
+        sock = ws.transport.get_extra_info("socket")
+        if sock is None:
+            return
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 262144)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 65536)
+        if hasattr(socket, "TCP_KEEPIDLE"):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 30)
+
+    @staticmethod
+    def _quickack(ws):
+        """Ask Linux to ACK the reply on ``ws`` right away instead of delaying it."""
+        # Linux desactiva QUICKACK por su cuenta: se vuelve a pedir antes de cada envío.
+        sock = ws.transport.get_extra_info("socket")
+        if sock is not None and hasattr(socket, "TCP_QUICKACK"):
             try:
-                return json.loads(self.ws.recv())
-            except Exception as e2:
-                print(f"❌ Error tras reconexión: {e2}")
-                raise e2
-
-    def subscribe_contract(self, contract_id: int):
-        """Subscribe to updates for a specific contract."""
-        self.safe_send({
-            "proposal_open_contract": 1,
-            "contract_id": int(contract_id),
-            "subscribe": 1,
-        })
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+            except OSError:
+                pass
+
+    async def _reconnect(self, stale):
+        """Replace ``stale`` with a new connection unless another caller already did."""
+        async with self._connect_lock:
+            if self.ws is not stale:
+                return
+            await stale.close()
+            delays = _backoff_delays()
+            for attempt in itertools.count(1):
+                try:
+                    await self._open()
+                    break
+                except (OSError, asyncio.TimeoutError, websockets.exceptions.WebSocketException) as e:
+                    if self.max_reconnect_attempts and attempt >= self.max_reconnect_attempts:
+                        raise
+                    delay = next(delays)
+                    log.warning("⚠️ Reconexión fallida (%s). Nuevo intento en %.1f s", e, delay)
+                    await asyncio.sleep(delay)
+            # Las suscripciones no sobreviven a la reconexión.
+            for contract_id in self._contract_queues:
+                await self.ws.send(_SUBSCRIBE_FRAME % contract_id, text=True)
+
+    async def _read_loop(self):
+        """Sole owner of ws.recv(); routes every message to the queue waiting for it."""
+        while True:
+            ws = self.ws
+            try:
+                # decode=False: bytes crudos al parser, sin pasada UTF-8 intermedia.
+                raw = await ws.recv(decode=False)
+            except (websockets.exceptions.ConnectionClosed, ssl.SSLError, ConnectionResetError) as e:
+                log.warning("⚠️ WebSocket desconectado. Reintentando conexión... (%s)", e)
+                try:
+                    await self._reconnect(ws)
+                except Exception as e2:
+                    log.error("❌ Error tras reconexión: %s", e2)
+                    self._abandon()
+                    return
+                continue
+            if self._wanted(raw):
+                self._dispatch(_json_loads(raw))
+
+    async def _pool_read_loop(self, index: int):
+        """Route replies arriving on one pool connection; reopen it if it drops."""
+        delays = None
+        failures = 0
+        while True:
+            ws = self._pool[index]
+            try:
+                raw = await ws.recv(decode=False)
+            except (websockets.exceptions.ConnectionClosed, ssl.SSLError, ConnectionResetError):
+                try:
+                    self._pool[index] = await self._connect_one()
+                    delays = None
+                    failures = 0
+                except Exception as e:
+                    failures += 1
+                    if self.max_reconnect_attempts and failures >= self.max_reconnect_attempts:
+                        # Sus compras pasan a la conexión principal; connect() reabre el pool.
+                        log.error("❌ Conexión de compra %d abandonada tras %d intentos: %s", index, failures, e)
+                        return
+                    delays = delays or _backoff_delays()
+                    delay = next(delays)
+                    log.error("❌ No se pudo reabrir la conexión de compra %d: %s (reintento en %.1f s)", index, e, delay)
+                    await asyncio.sleep(delay)
+                continue
+            if self._wanted(raw):
+                self._dispatch(_json_loads(raw))
 
-    def forget_all(self, stream_type: str):
+    def _abandon(self):
+        """Give up on the main connection: fail pending requests and let connect() start over."""
+        if self.ws is not None and not self.ws.transport.is_closing():
+            return  # otro connect() ya abrió una conexión nueva
+        self.ws = None
+        for fut in self._req_futures.values():
+            if not fut.done():
+                fut.set_exception(ConnectionError("conexión perdida"))
+
+    async def _send_buy(self, frame: bytes):
+        """Send an encoded buy on the next pool connection, falling back to the main one."""
+        if self._pool:
+            ws = self._pool[next(self._pool_rr) % len(self._pool)]
+            self._quickack(ws)
+            try:
+                await ws.send(frame, text=True)
+                return
+            except (websockets.exceptions.ConnectionClosed, ssl.SSLError, ConnectionResetError):
+                pass  # su lector la reabre; esta compra va por la conexión principal
+        # Envío directo, no por la cola del escritor: si falla, buy() lo sabe y reintenta.
+        if self.ws is None:
+            await self.connect()
+        await self._send_now(frame)
+
+    def _wanted(self, raw: bytes) -> bool:
+        """Cheap pre-check: can ``raw`` belong to a pending request or watched contract?"""
+        # Se extrae el id con su clave y se busca en el dict: coste fijo por mensaje
+        # sea cual sea el número de peticiones pendientes. Lo que nadie espera
+        # (ticks, respuestas de ping...) se descarta sin parsear.
+        match = _REQ_ID_RE.search(raw)
+        if match and int(match[1]) in self._req_futures:
+            return True
+        if not _POC_UPDATE_RE.search(raw) or not _IS_SOLD_RE.search(raw):
+            return False  # solo los contratos vendidos llegan a _wait_result
+        match = _CONTRACT_ID_RE.search(raw)
+        return match is not None and int(match[1]) in self._contract_queues
+
+    def _dispatch(self, msg: dict):
+        fut = self._req_futures.pop(msg.get("req_id"), None)
+        if fut is not None:
+            if not fut.done():
+                fut.set_result(msg)
+            return
+        poc = msg.get("proposal_open_contract")
+        if poc:
+            queue = self._contract_queues.get(poc.get("contract_id"))
+            if queue is not None:
+                queue.put_nowait(msg)
+
+    async def subscribe_contract(self, contract_id: int) -> asyncio.Queue:
+        """Subscribe to updates for a specific contract and return its queue."""
+        contract_id = int(contract_id)
+        queue = self._contract_queues[contract_id] = asyncio.Queue()
+        await self.send_frame(_SUBSCRIBE_FRAME % contract_id)
+        return queue
+
+    async def forget_contract(self, contract_id: int, subscription_id: str = None):
+        """Stop routing updates for a contract and forget its subscription."""
+        self._contract_queues.pop(int(contract_id), None)
+        if subscription_id:
+            await self.send_frame(_FORGET_FRAME % _json_dumps(subscription_id))
+
+    async def forget_all(self, stream_type: str):
         """Forget all subscriptions of a given type."""
-        self.safe_send({"forget_all": stream_type})
+        await self.send_frame(_FORGET_ALL_FRAME % _json_dumps(stream_type))
 
 
-    def buy(self, symbol: str, direction: str, duration: int, amount: float, retries: int = 3, delay: float = 2.0):
+    @staticmethod
+    def buy_request(symbol: str, direction: str, duration: int) -> bytes:
+        """Pre-encode a buy frame; ``buy`` only formats in the amount and req_id."""
         contract_type = "CALL" if direction.upper() == "CALL" else "PUT"
-        req = {
+        frame = _json_dumps({
             "buy": 1,
-            "price": amount,
+            "price": "__AMOUNT__",
             "parameters": {
-                "amount": amount,
+                "amount": "__AMOUNT__",
                 "basis": "stake",
                 "contract_type": contract_type,
                 "currency": "USD",
@@ -100,220 +449,412 @@ class DerivAPI:
                 "duration_unit": "m",
                 "symbol": symbol,
             },
-        }
+            "req_id": "__REQ_ID__",
+        })
+        # Plantilla %-bytes: se escapan los % literales y los marcadores pasan a %a / %d.
+        return (frame.replace(b"%", b"%%")
+                     .replace(b'"__AMOUNT__"', b"%a")
+                     .replace(b'"__REQ_ID__"', b"%d"))
+
+    async def buy(self, template: bytes, amount: float,
+                  retries: int = 3, delay: float = 2.0, timeout: float = 10.0):
+        """Send a frame built by ``buy_request`` for ``amount`` and return the reply.
+
+        Only a send that failed is retried: once the frame is out, a missing reply
+        raises instead of buying again, since the first order may have gone through.
+        """
+        amount = float(amount)
         for attempt in range(1, retries + 1):
+            req_id = next(self._req_ids)
+            fut = self._req_futures[req_id] = asyncio.get_running_loop().create_future()
             try:
-                self.safe_send(req)
-
-                while True:
-                    response = self.recv()
-                    if response.get("msg_type") == "buy":
-                        return response
-                    else:
-                        print(f"🔄 Ignorando mensaje no relacionado al 'buy': {response}")
-            except Exception as e:
-                print(f"⚠️ Intento {attempt} fallido en buy(): {e}")
-                time.sleep(delay)
-                self.connect()
-
-    def close(self):
+                try:
+                    await self._send_buy(template % (amount, amount, req_id))
+                except Exception as e:
+                    log.warning("⚠️ Intento %d fallido en buy(): %s", attempt, e)
+                    await asyncio.sleep(delay)
+                    continue
+                try:
+                    return await asyncio.wait_for(fut, timeout)
+                except asyncio.TimeoutError:
+                    log.error("❌ Compra req_id %d sin respuesta en %.0f s: revisar si se abrió un contrato.",
+                              req_id, timeout)
+                    raise RuntimeError(f"buy() sin respuesta (req_id {req_id})") from None
+            finally:
+                self._req_futures.pop(req_id, None)
+        raise RuntimeError(f"buy() falló tras {retries} intentos")
+
+    async def close(self):
+        tasks = [t for t in (self._reader, self._writer, *self._pool_readers) if t]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._reader = self._writer = None
+        self._pool_readers = []
+        for ws in self._pool:
+            await ws.close()
+        self._pool = []
         if self.ws:
-            self.ws.close()
+            await self.ws.close()
+            self.ws = None
 
 class DerivBot:
     def __init__(self, token: str, delay: int = 0, stake: float = 1.0,
                  martingale: bool = False, stop_win: float = 0.0,
-                 stop_loss: float = 0.0, percent: bool = False):
-        self.api = DerivAPI(token)
+                 stop_loss: float = 0.0, percent: bool = False,
+                 api: DerivAPI = None, max_reconnect_attempts: int = MAX_RECONNECT_ATTEMPTS):
+        # Una conexión ya autorizada (p. ej. precalentada por la UI) se reutiliza
+        # y no se cierra al terminar.
+        self._owns_api = api is None
+        self.api = api if api is not None else DerivAPI(
+            token, max_reconnect_attempts=max_reconnect_attempts)
         self.delay = delay
         self.stake = stake
         self.martingale = martingale
         self.stop_win = stop_win
         self.stop_loss = stop_loss
         self.percent = percent
+        # Estructura de arrays paralelos ordenados por deadline: el planificador recorre
+        # doubles contiguos y solo toca la Signal cuando toca dispararla.
+        self._deadlines = array.array("d")
         self.signals: List[Signal] = []
+        self._cursor = 0  # primera señal aún no disparada
+        # Desfase reloj monotónico - reloj de pared, medido una vez: señales con la
+        # misma hora reciben el mismo deadline y conservan su orden de llegada.
+        self._clock_offset = time.monotonic() - time.time()
         self.win_amount = 0.0
         self.loss_amount = 0.0
         self.current_stake = stake
         self.running = False
+        self.loop = None
         self.thread = None
+        self.future = None
+        self._stop_event = asyncio.Event()
+        # Fijado por un stop win/loss global: despierta al planificador sin cancelar
+        # los trades en curso, que terminan y registran su resultado.
+        self._halted = asyncio.Event()
+
+    def _halt(self):
+        """Stop scheduling new signals from inside the event loop."""
+        self.running = False
+        self._halted.set()
 
-    def _start_pinger(self, interval=60):
-        """Lanza un hilo para enviar pings periódicos al servidor."""
-        def ping_loop():
-            while self.running:
-                try:
-                    self.api.safe_send({"ping": 1})
-                    print("📡 Ping enviado al servidor Deriv.")
-                except Exception as e:
-                    print(f"⚠️ Error al enviar ping: {e}")
-                time.sleep(interval)
-        threading.Thread(target=ping_loop, daemon=True).start()
-
-    def _wait_result(self, contract_id: int) -> float:
+    async def _wait_result(self, contract_id: int, timeout: float) -> float:
         """Wait for a contract to be sold and return the profit."""
-        self.api.subscribe_contract(contract_id)
-        profit = 0.0
-        attempts = 0
-        while attempts < 300:  # máximo 300 intentos (~30s si 100ms entre cada uno)
-            msg = self.api.recv()
-            poc = msg.get("proposal_open_contract")
-            if poc and poc.get("contract_id") == contract_id:
-                if poc.get("is_sold"):
-                    profit = float(poc.get("profit", 0))
-                    self.api.forget_all("proposal_open_contract")
-                    break
-            time.sleep(0.1)
-            attempts += 1
-        else:
-            print(f"Timeout esperando resultado para contrato {contract_id}")
-        return profit
+        queue = await self.api.subscribe_contract(contract_id)
 
-    def add_signal(self, signal: Signal):
-        self.signals.append(signal)
-        self.signals.sort(key=lambda s: s.time)
+        async def settled():
+            while True:
+                msg = await queue.get()
+                if msg["proposal_open_contract"].get("is_sold"):
+                    return msg
+
+        try:
+            msg = await asyncio.wait_for(settled(), timeout)
+        except asyncio.CancelledError:
+            log.warning("⚠️ Contrato %s abandonado sin conocer su resultado.", contract_id)
+            raise
+        except asyncio.TimeoutError:
+            log.warning("Timeout esperando resultado para contrato %s", contract_id)
+            await self.api.forget_contract(contract_id)
+            return 0.0
+        await self.api.forget_contract(contract_id, msg.get("subscription", {}).get("id"))
+        return float(msg["proposal_open_contract"].get("profit", 0))
 
-    def start(self):
+    def add_signal(self, signal: Signal):
+        signal.buy_template = DerivAPI.buy_request(
+            signal.symbol, signal.direction, signal.duration_min
+        )
+        # El instante de disparo se pasa una vez al reloj monotónico: el planificador
+        # solo compara floats y no le afectan los ajustes del reloj del sistema.
+        signal.deadline = signal.time.timestamp() + self._clock_offset - self.delay
+        # bisect_right: a igual deadline, la señal nueva va detrás de las anteriores.
+        index = bisect.bisect_right(self._deadlines, signal.deadline)
+        self._deadlines.insert(index, signal.deadline)
+        self.signals.insert(index, signal)
+
+    def start(self, loop: asyncio.AbstractEventLoop = None):
+        """Run the bot on ``loop``, or on a dedicated event loop thread if none is given."""
         if self.running:
             return
         self.running = True
-        self.thread = threading.Thread(target=self._run)
-        self.thread.start()
+        if loop is None:
+            loop = asyncio.new_event_loop()
+            self.thread = threading.Thread(target=self._run_loop, args=(loop,), daemon=True)
+            self.thread.start()
+        self.loop = loop
+        self.future = asyncio.run_coroutine_threadsafe(self.run_async(), loop)
+        if self.thread:
+            self.future.add_done_callback(
+                lambda _: loop.call_soon_threadsafe(loop.stop)
+            )
 
-    def stop(self):
+    def request_stop(self):
+        """Ask the bot to stop without blocking; safe to call from any thread."""
         self.running = False
+        if self.loop is None:
+            self._halted.set()
+            self._stop_event.set()  # todavía sin bucle: nadie espera el evento
+            return
+        try:
+            # _halted despierta al planificador; _stop_event avisa a run_async.
+            self.loop.call_soon_threadsafe(self._halted.set)
+            self.loop.call_soon_threadsafe(self._stop_event.set)
+        except RuntimeError:
+            pass  # el bucle ya terminó
+
+    def stop(self, timeout: float = 2.0):
+        """Request a stop and wait up to ``timeout`` seconds for the run to wind down."""
+        self.request_stop()
+        if self.future:
+            try:
+                self.future.result(timeout=timeout)
+            except Exception:
+                pass  # el error ya se reporta a quien observa el future
         if self.thread:
-            self.thread.join()
-
-    def _run_signal(self, sig: Signal):
-        now = datetime.now()
-        wait_time = (sig.time - timedelta(seconds=self.delay) - now).total_seconds()
-        if wait_time > 0:
-            time.sleep(wait_time)
-
+            self.thread.join(timeout)
+
+    @staticmethod
+    def _run_loop(loop: asyncio.AbstractEventLoop):
+        """Drive the event loop and cancel whatever is still pending once it stops."""
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+        pending = asyncio.all_tasks(loop)
+        for task in pending:
+            task.cancel()
+        loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        loop.close()
+
+    async def _run_signal(self, sig: Signal):
         win_amount = 0.0
         loss_amount = 0.0
-        current_stake = self.stake
+        current_stake = base_stake = self.stake
         profit = -1.0
+        # Invariantes del bucle ligados una vez: sin búsquedas de atributos por intento.
+        api_buy = self.api.buy
+        wait_result = self._wait_result
+        percent = self.percent
+        template = sig.buy_template
+        # Duración del contrato más un margen para la liquidación.
+        result_timeout = sig.duration_min * 60 + 30
 
         if sig.martingale:
-            print(f"📈 Inicio Martingala para {sig.symbol} {sig.direction} timeframe {sig.timeframe}")
+            log.info("📈 Inicio Martingala para %s %s timeframe %s", sig.symbol, sig.direction, sig.timeframe)
         else:
-            print(f"📈 Ejecutando señal simple para {sig.symbol} {sig.direction} timeframe {sig.timeframe}")
+            log.info("📈 Ejecutando señal simple para %s %s timeframe %s", sig.symbol, sig.direction, sig.timeframe)
 
         while self.running and profit <= 0:
             amount = current_stake
-            if self.percent:
+            if percent:
                 balance = 1000  # placeholder
                 amount = balance * current_stake / 100
 
-            print(f"🟡 Ejecutando {sig.symbol} {sig.direction} {sig.timeframe} @ {datetime.now()} con monto {amount}")
+            log.info("🟡 Ejecutando %s %s %s con monto %s", sig.symbol, sig.direction, sig.timeframe, amount)
 
             try:
-                result = self.api.buy(sig.symbol, sig.direction, int(sig.timeframe[1:]), amount)
+                result = await api_buy(template, amount)
             except Exception as e:
-                print(f"❌ Error al ejecutar trade: {e}")
+                log.error("❌ Error al ejecutar trade: %s", e)
                 break
 
             contract_id = result.get("buy", {}).get("contract_id")
             if not contract_id:
-                print("❌ No se recibió contract_id. Resultado:", result)
+                log.error("❌ No se recibió contract_id. Resultado: %s", result)
                 break
 
-            profit = self._wait_result(contract_id)
+            profit = await wait_result(contract_id, result_timeout)
             if profit == 0:
-                print(f"⚠️ No se obtuvo ganancia. Verificar contrato o posible error.")
+                log.warning("⚠️ No se obtuvo ganancia. Verificar contrato o posible error.")
 
 
             if profit > 0:
-                print(f"✅ Trade ganado. Ganancia: {profit}")
+                log.info("✅ Trade ganado. Ganancia: %s", profit)
                 win_amount += profit
-                current_stake = self.stake
+                current_stake = base_stake
 
                 if sig.stop_win > 0 and win_amount >= sig.stop_win:
-                    print("🎯 Stop win alcanzado para señal.")
+                    log.info("🎯 Stop win alcanzado para señal.")
                     break
                 if self.stop_win > 0 and win_amount >= self.stop_win:
-                    print("🎯 Stop win global alcanzado.")
-                    self.running = False
+                    log.info("🎯 Stop win global alcanzado.")
+                    self._halt()
                     break
                 break  # terminó con ganancia
 
             else:
                 if profit == 0:
-                    print(f"⚠️ Trade sin ganancia ni pérdida (break-even).")
+                    log.info("⚠️ Trade sin ganancia ni pérdida (break-even).")
                 else:
-                    print(f"🔁 Trade perdido. Pérdida: {-profit}")
+                    log.info("🔁 Trade perdido. Pérdida: %s", -profit)
 
-                print(f"🔁 Trade perdido. Perdida: {-profit}")
                 loss_amount += -profit
 
                 if sig.stop_loss > 0 and loss_amount >= sig.stop_loss:
-                    print("🛑 Stop loss alcanzado para señal.")
+                    log.info("🛑 Stop loss alcanzado para señal.")
                     break
                 if self.stop_loss > 0 and loss_amount >= self.stop_loss:
-                    print("🛑 Stop loss global alcanzado.")
-                    self.running = False
+                    log.info("🛑 Stop loss global alcanzado.")
+                    self._halt()
                     break
 
                 if not sig.martingale:
-                    print("📌 Martingala desactivada para esta señal.")
+                    log.info("📌 Martingala desactivada para esta señal.")
                     break
 
                 current_stake *= 2
-                print(f"⚠️ Reintentando con Martingala. Nuevo stake: {current_stake}")
+                log.info("⚠️ Reintentando con Martingala. Nuevo stake: %s", current_stake)
 
         
         if sig.martingale:
-            print(f"🏁 Fin Martingala para {sig.symbol}. Último profit: {profit}, stake final: {current_stake}")
+            log.info("🏁 Fin Martingala para %s. Último profit: %s, stake final: %s", sig.symbol, profit, current_stake)
         else:
-            print(f"📈 fin operación simple para {sig.symbol} {sig.direction} timeframe {sig.timeframe}")
-
-    def _run(self):
-        self.api.connect()
-        self._start_pinger()  # ✅ mantener la sesión WebSocket viva
-
-        threads = []
-
-
-        for sig in self.signals:
-            t = threading.Thread(target=self._run_signal, args=(sig,))
-            t.start()
-            threads.append(t)
-
-        for t in threads:
-            t.join()
-
-        self.api.close()
-        self.running = False
+            log.info("📈 fin operación simple para %s %s timeframe %s", sig.symbol, sig.direction, sig.timeframe)
+
+    async def _sleep_until(self, deadline: float):
+        """Sleep until ``deadline`` on the monotonic clock or until the bot halts."""
+        halted = self._halted
+        while self.running:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                await asyncio.wait_for(halted.wait(), min(SCHEDULE_TICK, remaining))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _schedule(self):
+        # Un solo temporizador recorre las señales en orden; solo las que ya
+        # dispararon viven como tareas.
+        tasks = []
+        deadlines, signals = self._deadlines, self.signals
+        # Se reanuda en _cursor: lo anterior ya se disparó en esta ejecución.
+        index = self._cursor
+        try:
+            while index < len(deadlines) and self.running:
+                await self._sleep_until(deadlines[index])
+                if not self.running:
+                    break
+                signal = signals[index]
+                signal.fired = True
+                tasks.append(asyncio.create_task(self._run_signal(signal)))
+                index += 1
+                self._cursor = index
+            pending = sum(not task.done() for task in tasks)
+            if pending and not self.running:
+                log.info("⏳ Esperando el resultado de %d señales en curso...", pending)
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def run_async(self):
+        """Run all signals on the current event loop until they finish or a stop is requested."""
+        if self._stop_event.is_set():
+            return
+        self.running = True
+        scheduler = stopper = None
+        try:
+            await self.api.connect()  # no-op si la conexión ya está abierta
+            scheduler = asyncio.create_task(self._schedule())
+            stopper = asyncio.create_task(self._stop_event.wait())
+            await asyncio.wait({scheduler, stopper}, return_when=asyncio.FIRST_COMPLETED)
+            if not scheduler.done():
+                # Parada pedida: ya no se disparan señales, pero los contratos comprados
+                # esperan su resultado; cada espera ya está acotada por su result_timeout.
+                await asyncio.wait({scheduler})
+            if scheduler.done():
+                scheduler.result()  # propaga errores del planificador
+        finally:
+            for task in (scheduler, stopper):
+                if task:
+                    task.cancel()
+            await asyncio.gather(*(t for t in (scheduler, stopper) if t), return_exceptions=True)
+            if self._owns_api:
+                await self.api.close()
+            self.running = False
 
       
 
+# Los pares forex se convierten con la regla frx + par; aquí solo van las
+# excepciones a esa convención.
 PAIR_MAP = {
-    "EURUSD": "frxEURUSD",
-    "GBPUSD": "frxGBPUSD",
-    "GBPJPY": "frxGBPJPY",
-    "AUDJPY": "frxAUDJPY",
-    "EURGBP": "frxEURGBP",
-    "EURJPY": "frxEURJPY",
+    "BTCUSD": "cryBTCUSD",
+    "ETHUSD": "cryETHUSD",
 }
+# Divisas y metales que Deriv cotiza como frx<BASE><COTIZADA>. Un símbolo de 6 letras
+# solo se trata como forex si sus dos mitades están aquí (WLDUSD, p. ej., es un índice).
+_FOREX_CODES = frozenset({
+    "AUD", "CAD", "CHF", "CNH", "DKK", "EUR", "GBP", "HKD", "JPY", "MXN", "NOK",
+    "NZD", "PLN", "SEK", "SGD", "USD", "ZAR", "XAG", "XAU", "XPD", "XPT",
+})
+# Prefijos de mercado de Deriv, que van en minúsculas aunque se peguen en mayúsculas.
+_MARKET_PREFIXES = ("FRX", "CRY", "STP")
+
+# Línea completa dd/mm/yyyy;HH:MM;PAR;CALL|PUT;TF validada y troceada en un solo match.
+# [^\S\n] es espacio sin salto de línea: con re.M cada match queda dentro de su línea
+# y finditer recorre todo el texto pegado de una vez.
+_SIGNAL_RE = re.compile(
+    r"^[^\S\n]*(\d{1,2})/(\d{1,2})/(\d{4})[^\S\n]*;[^\S\n]*(\d{1,2}):(\d{2})[^\S\n]*;"
+    r"[^\S\n]*(\w+)[^\S\n]*;[^\S\n]*(CALL|PUT)[^\S\n]*;[^\S\n]*([A-Z]\d+)[^\S\n]*$",
+    re.I | re.M,
+)
+# Los tickers son ASCII puro; translate evita la lógica Unicode de str.upper().
+_UPPER_TABLE = str.maketrans(string.ascii_lowercase, string.ascii_uppercase)
+
+@functools.lru_cache(maxsize=256)
+def _normalize_symbol(raw: str) -> str:
+    """Deriv symbol for a pasted pair; pairs repeat a lot, so results are memoized."""
+    symbol = raw.translate(_UPPER_TABLE)
+    mapped = PAIR_MAP.get(symbol)
+    if mapped is not None:
+        return mapped
+    if symbol.startswith(_MARKET_PREFIXES):
+        return symbol[:3].lower() + symbol[3:]
+    if len(symbol) == 6 and symbol[:3] in _FOREX_CODES and symbol[3:] in _FOREX_CODES:
+        return "frx" + symbol  # cualquier par forex, esté o no en la lista
+    return symbol  # índices como R_100, 1HZ100V o WLDAUD tal cual
 
 def parse_signal(line: str) -> Signal:
-    parts = [p.strip() for p in line.split(';')]
-    if len(parts) != 5:
+    # Acepta líneas leídas de un archivo (for line in f), con su \n o \r\n final.
+    m = _SIGNAL_RE.fullmatch(line.rstrip("\r\n"))
+    if m is None:
         raise ValueError(f"Invalid signal format: {line}")
-    date_part = parts[0]
-    time_part = parts[1]
-    dt = datetime.strptime(f"{date_part} {time_part}", "%d/%m/%Y %H:%M")
-    symbol = PAIR_MAP.get(parts[2].upper(), parts[2].upper())
-    direction = parts[3].upper()
-    timeframe = parts[4].upper()
-    return Signal(time=dt, symbol=symbol, direction=direction, timeframe=timeframe)
+    return _signal_from_match(m)
+
+def parse_signals(text: str) -> List[Signal]:
+    """Parse every signal in ``text`` in one regex pass; blank lines are skipped."""
+    signals = []
+    append = signals.append
+    pos = 0
+    for m in _SIGNAL_RE.finditer(text):
+        gap = text[pos:m.start()]
+        if gap and not gap.isspace():
+            break  # hay texto que no es señal antes de este match
+        append(_signal_from_match(m))
+        pos = m.end()
+    else:
+        tail = text[pos:]
+        if not tail or tail.isspace():
+            return signals
+    bad = text[pos:].lstrip().partition("\n")[0]
+    raise ValueError(f"Invalid signal format: {bad}")
+
+def _signal_from_match(m: re.Match) -> Signal:
+    day, month, year, hour, minute = int(m[1]), int(m[2]), int(m[3]), int(m[4]), int(m[5])
+    dt = datetime(year, month, day, hour, minute)
+    timeframe = m[8].translate(_UPPER_TABLE)
+    return Signal(time=dt, symbol=_normalize_symbol(m[6]),
+                  direction=m[7].translate(_UPPER_TABLE),
+                  timeframe=timeframe, duration_min=int(timeframe[1:]),
+                  date_str=f"{day:02d}/{month:02d}/{year:04d}",
+                  time_str=f"{hour:02d}:{minute:02d}")
 
 class BotUI:
     def __init__(self):
-        if tk is None:
-            raise RuntimeError("tkinter is required for the UI")
+        try:
+            _tk()
+        except ImportError:
+            raise RuntimeError("tkinter is required for the UI") from None
         self.root = tk.Tk()
         self.root.title("Deriv Bot")
         self.accounts = {}
@@ -321,21 +862,115 @@ class BotUI:
         self.console_visible = tk.BooleanVar(value=True)
         self.row_signals: Dict[str, Signal] = {}
         self.bot = None
+        # Bots detenidos que aún esperan el resultado de sus contratos.
+        self._draining: Set[DerivBot] = set()
+        # Sesiones autorizadas por token, reutilizadas entre arranques y cambios de cuenta.
+        self._api_pool: Dict[str, DerivAPI] = {}
+        self._api_last_used: Dict[str, float] = {}
+        # Bots terminados (bot, future): los encola el hilo asyncio y los atiende _pump_console.
+        self._done_bots = queue.SimpleQueue()
+        self._config_path = self._compute_config_path()
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, daemon=True, name="deriv-aio").start()
+        self.account_var.trace_add("write", self._warm_up)
         #self._build()
         self._build_ui()
+        self._bind_cache()
         self.load_accounts()
         self.redirect_output()
+        self.root.after(API_SWEEP_MS, self._sweep_api_pool)
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
     def on_close(self):
+        # Al salir no se espera a los contratos abiertos: se cancelan y quedan en el log.
         if self.bot:
-            self.bot.stop()
+            self._draining.add(self.bot)
             self.bot = None
+        for bot in self._draining:
+            bot.request_stop()
+            bot.future.cancel()
+        self._draining.clear()
+        closing = [asyncio.run_coroutine_threadsafe(api.close(), self._loop)
+                   for api in self._api_pool.values()]
+        self._api_pool.clear()
+        self._api_last_used.clear()
+        # Los cierres corren en el bucle: se espera a que terminen antes de pararlo.
+        concurrent.futures.wait(closing, timeout=API_CLOSE_TIMEOUT)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._log_listener.stop()
         self.root.destroy()
 
+    def _warm_up(self, *_):
+        """Open the selected account's connection in the background so Start hits a warm session."""
+        token = self.accounts.get(self.account_var.get(), "").strip()
+        if token:
+            self._pooled_api(token)
+
+    def _pooled_api(self, token: str) -> DerivAPI:
+        """Return the cached DerivAPI for ``token``, connecting a new one in the background if needed."""
+        self._api_last_used[token] = time.monotonic()
+        api = self._api_pool.get(token)
+        if api is not None:
+            return api  # si la conexión cayó, DerivBot.run_async vuelve a llamar connect()
+        api = self._api_pool[token] = DerivAPI(token, max_reconnect_attempts=MAX_RECONNECT_ATTEMPTS)
+        future = asyncio.run_coroutine_threadsafe(api.connect(), self._loop)
+
+        def report(f):
+            if not f.cancelled() and f.exception():
+                log.warning("⚠️ No se pudo preconectar la cuenta: %s", f.exception())
+        future.add_done_callback(report)
+        return api
+
+    def _sweep_api_pool(self):
+        """Close pooled connections that have been idle longer than API_IDLE_TIMEOUT."""
+        now = time.monotonic()
+        active = {bot.api for bot in self._draining}
+        if self.bot:
+            active.add(self.bot.api)
+        for token, api in list(self._api_pool.items()):
+            if api in active:
+                self._api_last_used[token] = now  # en uso: el reloj de inactividad no corre
+            elif now - self._api_last_used[token] > API_IDLE_TIMEOUT:
+                del self._api_pool[token], self._api_last_used[token]
+                asyncio.run_coroutine_threadsafe(api.close(), self._loop)
+                log.info("🔌 Conexión inactiva cerrada.")
+        self.root.after(API_SWEEP_MS, self._sweep_api_pool)
+
     def redirect_output(self):
-        sys.stdout = ConsoleRedirector(self.console_output)
-        sys.stderr = ConsoleRedirector(self.console_output)
+        self._console = ConsoleRedirector()
+        sys.stdout = self._console
+        sys.stderr = self._console
+        self._setup_logging()
+        self._pump_console()
+
+    def _setup_logging(self):
+        """Send bot logs through a queue so emitting threads only enqueue records."""
+        handler = logging.StreamHandler(self._console)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s", "%H:%M:%S"))
+        log_queue = queue.SimpleQueue()
+        self._log_listener = logging.handlers.QueueListener(log_queue, handler)
+        log.addHandler(logging.handlers.QueueHandler(log_queue))
+        log.setLevel(logging.INFO)
+        self._log_listener.start()
+
+    def _pump_console(self):
+        """Flush buffered output into the console widget from the Tk thread."""
+        buf = self._console.q
+        chunks = []
+        while buf:
+            chunks.append(buf.popleft())
+        if chunks:
+            out = self.console_output
+            out.configure(state="normal")
+            out.insert("end", "".join(chunks))
+            extra = int(out.index("end-1c").split(".")[0]) - CONSOLE_MAX_LINES
+            if extra > 0:
+                out.delete("1.0", f"{extra + 1}.0")
+            out.see("end")
+            out.configure(state="disabled")
+        while not self._done_bots.empty():
+            self._on_bot_done(*self._done_bots.get_nowait())
+        self.root.after(CONSOLE_PUMP_MS, self._pump_console)
 
     def toggle_console(self):
         if self.console_visible.get():
@@ -406,7 +1041,8 @@ class BotUI:
 
     def stop_bot(self):
         if self.bot:
-            self.bot.stop()
+            self.bot.request_stop()
+            self._draining.add(self.bot)  # su conexión sigue en uso hasta que termine
             self.bot = None
         self.set_ui_enabled(True)
         self.enable_all_inputs()
@@ -531,31 +1167,89 @@ class BotUI:
         )
         self.console_output.pack(fill="both", expand=True)
 
+    def _bind_cache(self):
+        """Mirror Tk variables and the signals text in ``self._cache`` so reads skip Tcl."""
+        self._cache = {}
+        variables = {
+            "delay": self.delay_var,
+            "stake": self.stake_var,
+            "percent": self.percent_var,
+            "martingale": self.martingale_var,
+            "stop_win": self.stop_win_var,
+            "stop_loss": self.stop_loss_var,
+        }
 
-
-    
-    def get_config_path(self, filename="keys.json"):
-        """Ruta persistente segura (escribible) para configuraciones."""
-        base_dir = os.path.expanduser("~")  # Carpeta del usuario (segura para escritura)
-        app_dir = os.path.join(base_dir, ".deriv_bot")  # Subcarpeta oculta para tu app
-
-        if not os.path.exists(app_dir):
-            os.makedirs(app_dir)
-
-        return os.path.join(app_dir, filename)
+        def tracer(key, var):
+            def update(*_):
+                try:
+                    self._cache[key] = var.get()
+                except tk.TclError:
+                    # Campo vacío o no numérico: None obliga a corregirlo antes de operar,
+                    # nunca se opera con un valor viejo que la UI ya no muestra.
+                    self._cache[key] = None
+            return update
+
+        for key, var in variables.items():
+            update = tracer(key, var)
+            var.trace_add("write", update)
+            update()
+        self._cache["signals"] = ""
+        self.signals_text.bind("<<Modified>>", self._on_signals_modified)
+
+    _FIELD_LABELS = {
+        "delay": "Delay",
+        "stake": "Stake",
+        "percent": "Stake %",
+        "martingale": "Martingale",
+        "stop_win": "Stop Win",
+        "stop_loss": "Stop Loss",
+    }
+
+    def _invalid_fields(self, *keys) -> bool:
+        """Show an error and return True if any cached field in ``keys`` holds an invalid entry."""
+        bad = [self._FIELD_LABELS[key] for key in keys if self._cache[key] is None]
+        if bad:
+            messagebox.showerror("Error", f"Valor inválido en: {', '.join(bad)}")
+            return True
+        return False
+
+    def _on_signals_modified(self, _event=None):
+        """Refresh the cached signals text only when the widget content changes."""
+        text = self.signals_text
+        if text.edit_modified():
+            self._cache["signals"] = text.get("1.0", "end-1c")
+            text.edit_modified(False)  # rearma <<Modified>> para el próximo cambio
+
+    @staticmethod
+    def _compute_config_path(filename="keys.jsonl") -> Path:
+        """Ruta persistente segura (escribible) para configuraciones; se calcula una vez."""
+        # Carpeta del usuario (segura para escritura) con una subcarpeta oculta para la app.
+        app_dir = Path.home() / ".deriv_bot"
+        app_dir.mkdir(parents=True, exist_ok=True)
+        return app_dir / filename
 
 
 
     def load_accounts(self):
-        """Load saved accounts from keys.json en una ruta segura."""
-        path = self.get_config_path()
-        if not os.path.exists(path):
-            with open(path, "w", encoding="utf-8") as f:
-                json.dump({}, f)
-
+        """Load saved accounts from keys.jsonl (one {name: token} per line); later lines win."""
+        path = self._config_path
+        self.accounts = {}
+        damaged = False
+        line = b""
         try:
-            with open(path, "r", encoding="utf-8") as f:
-                self.accounts = json.load(f)
+            with open(path, "rb") as f:
+                for line in f:
+                    try:
+                        self.accounts.update(_json_loads(line))
+                    except (ValueError, TypeError):
+                        # Línea truncada por un cierre a mitad de escritura.
+                        damaged = damaged or bool(line.strip())
+            # Sin \n final el próximo append se pegaría a la última línea.
+            damaged = damaged or bool(line.strip() and not line.endswith(b"\n"))
+            if damaged:
+                self.save_accounts()  # reescribe limpio para que el próximo append no se pegue
+        except FileNotFoundError:
+            self._migrate_accounts()
         except Exception:
             self.accounts = {}
 
@@ -564,12 +1258,36 @@ class BotUI:
         if names:
             self.account_var.set(names[0])
 
+    def _migrate_accounts(self):
+        """Import the legacy keys.json, if any, into a fresh keys.jsonl."""
+        legacy = self._config_path.with_name("keys.json")
+        try:
+            self.accounts = _json_loads(legacy.read_bytes())
+        except FileNotFoundError:
+            pass
+        except Exception:
+            self.accounts = {}
+        self.save_accounts()
+
+    def append_account(self, name: str, token: str):
+        """Append one account to keys.jsonl instead of rewriting the whole file."""
+        try:
+            with open(self._config_path, "ab") as f:
+                f.write(_json_dumps({name: token}) + b"\n")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to save accounts: {e}")
+
     def save_accounts(self):
-        """Save accounts to keys.json en una ruta segura."""
-        path = self.get_config_path()
+        """Rewrite keys.jsonl from ``self.accounts``, one account per line."""
+        path = self._config_path
+        tmp = path.with_name(path.name + ".tmp")
         try:
-            with open(path, "w", encoding="utf-8") as f:
-                json.dump(self.accounts, f, indent=2)
+            # Se escribe aparte y se reemplaza de forma atómica: un cierre a mitad
+            # de escritura nunca deja keys.jsonl truncado.
+            with open(tmp, "wb") as f:
+                f.writelines(_json_dumps({name: token}) + b"\n"
+                             for name, token in self.accounts.items())
+            os.replace(tmp, path)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save accounts: {e}")
 
@@ -595,7 +1313,7 @@ class BotUI:
                 messagebox.showerror("Error", "Nombre y Token requeridos")
                 return
             self.accounts[name] = token
-            self.save_accounts()
+            self.append_account(name, token)
             self.account_combo["values"] = list(self.accounts.keys())
             self.account_var.set(name)
             top.destroy()
@@ -603,16 +1321,48 @@ class BotUI:
         ttk.Button(top, text="Guardar", command=save).grid(column=0, row=2, columnspan=2, pady=5)
 
 
-    def apply_globals(self):
-        """Apply global parameters to checked signals in the table."""
+    def apply_globals(self, defer: bool = False):
+        """Apply global parameters to checked signals; ``defer`` redraws their rows on idle."""
+        if self._invalid_fields("stop_win", "stop_loss", "martingale"):
+            return
+        # Valores ya reflejados en _cache por las trazas: sin viajes a Tcl.
+        cache = self._cache
+        sw, sl, mg = cache["stop_win"], cache["stop_loss"], cache["martingale"]
+        row_values = self._row_values
+        updates = []
         for row_id, sig in self.row_signals.items():
             if sig.use_global:
-                sig.stop_win = self.stop_win_var.get()
-                sig.stop_loss = self.stop_loss_var.get()
-                sig.martingale = self.martingale_var.get()
-                self.tree.set(row_id, "sw", sig.stop_win)
-                self.tree.set(row_id, "sl", sig.stop_loss)
-                self.tree.set(row_id, "mg", "Yes" if sig.martingale else "No")
+                sig.stop_win = sw
+                sig.stop_loss = sl
+                sig.martingale = mg
+                updates.append((row_id, row_values(sig)))
+        if defer:
+            self.root.after_idle(self._update_rows, updates)
+        else:
+            self._update_rows(updates)
+
+    def _update_rows(self, updates):
+        """Write ``(row_id, values)`` pairs to the table, one Tcl call per row."""
+        tree_item, exists = self.tree.item, self.tree.exists
+        for row_id, values in updates:
+            # Con defer, load_signals puede haber borrado la fila antes de este repintado.
+            if exists(row_id):
+                tree_item(row_id, values=values)
+
+    @staticmethod
+    def _row_values(sig: Signal) -> tuple:
+        """Values for every table column of ``sig``, in column order."""
+        return (
+            "✓" if sig.use_global else "",
+            sig.date_str,
+            sig.time_str,
+            sig.symbol,
+            sig.direction,
+            sig.timeframe,
+            sig.stop_win,
+            sig.stop_loss,
+            "Yes" if sig.martingale else "No",
+        )
 
 
     def start_bot(self):
@@ -623,17 +1373,33 @@ class BotUI:
         if not self.row_signals:
             messagebox.showerror("Error", "No se han cargado señales")
             return
+        if self._invalid_fields(*self._FIELD_LABELS):
+            return
+        # Las señales disparadas en un arranque anterior no se repiten.
+        fired = sum(sig.fired for sig in self.row_signals.values())
+        if fired == len(self.row_signals):
+            messagebox.showerror("Error", "Todas las señales ya se ejecutaron")
+            return
+        cache = self._cache
         self.bot = DerivBot(
             token=token,
-            delay=self.delay_var.get(),
-            stake=self.stake_var.get(),
-            martingale=self.martingale_var.get(),
-            stop_win=self.stop_win_var.get(),
-            stop_loss=self.stop_loss_var.get(),
-            percent=self.percent_var.get(),
+            delay=cache["delay"],
+            stake=cache["stake"],
+            martingale=cache["martingale"],
+            stop_win=cache["stop_win"],
+            stop_loss=cache["stop_loss"],
+            percent=cache["percent"],
+            api=self._pooled_api(token),
         )
-        self.apply_globals()
+        # Las señales se actualizan ya; la tabla se repinta cuando Tk quede libre.
+        self.apply_globals(defer=True)
+        late = 0
+        now = time.time() + cache["delay"]
         for row_id, sig in self.row_signals.items():
+            if sig.fired:
+                continue
+            if sig.time.timestamp() <= now:
+                late += 1  # hora ya pasada: se opera al arrancar
             # if sig.use_global:
             #     sig.stop_win = self.stop_win_var.get()
             #     sig.stop_loss = self.stop_loss_var.get()
@@ -642,44 +1408,69 @@ class BotUI:
             #     self.tree.set(row_id, "sl", sig.stop_loss)
             #     self.tree.set(row_id, "mg", "Yes" if sig.martingale else "No")
             self.bot.add_signal(sig)
-        self.bot.start()
+        self.bot.start(self._loop)  # run_async() vía run_coroutine_threadsafe en el bucle de la UI
+        bot = self.bot
+        # El callback corre en el hilo deriv-aio: solo encola, nunca toca Tk.
+        bot.future.add_done_callback(lambda f: self._done_bots.put((bot, f)))
 
         self.set_ui_enabled(False)
         self.stop_button["state"] = "normal"
 
-        messagebox.showinfo("Bot", "Bot started")
+        message = "Bot started"
+        if fired:
+            message += f"\n{fired} señales ya ejecutadas omitidas"
+        if late:
+            message += f"\n{late} señales vencidas se ejecutan ahora"
+        messagebox.showinfo("Bot", message)
+
+    def _on_bot_done(self, bot: DerivBot, future):
+        """Called from _pump_console when a bot run ends; reports errors and re-enables the UI."""
+        self._draining.discard(bot)
+        if bot is not self.bot:
+            return  # detenido desde stop_bot, que ya restauró la UI
+        self.bot = None
+        self.set_ui_enabled(True)
+        self.enable_all_inputs()
+        self.stop_button["state"] = "disabled"
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error:
+            log.error("❌ El bot terminó con error: %s", error)
+            messagebox.showerror("Error", str(error))
+        else:
+            messagebox.showinfo("Bot", "Bot finalizado")
 
     def load_signals(self):
-        self.tree.delete(*self.tree.get_children())
-        self.row_signals.clear()
-        lines = self.signals_text.get("1.0", tk.END).strip().splitlines()
-        for line in lines:
-            if not line.strip():
-                continue
-            try:
-                sig = parse_signal(line)
-                sig.stop_win = self.stop_win_var.get()
-                sig.stop_loss = self.stop_loss_var.get()
-                sig.martingale = self.martingale_var.get()
-                row_id = self.tree.insert(
-                    "",
-                    "end",
-                    values=(
-                        "",
-                        sig.time.strftime("%d/%m/%Y"),
-                        sig.time.strftime("%H:%M"),
-                        sig.symbol,
-                        sig.direction,
-                        sig.timeframe,
-                        sig.stop_win,
-                        sig.stop_loss,
-                        "Yes" if sig.martingale else "No",
-                    ),
-                )
-                self.row_signals[row_id] = sig
-            except Exception as e:
-                messagebox.showerror("Error", str(e))
-                return
+        if self._invalid_fields("stop_win", "stop_loss", "martingale"):
+            return
+        cache = self._cache
+        sw, sl, mg = cache["stop_win"], cache["stop_loss"], cache["martingale"]
+        try:
+            signals = parse_signals(cache["signals"])
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        for sig in signals:
+            sig.stop_win = sw
+            sig.stop_loss = sl
+            sig.martingale = mg
+        # Un solo sort estable al final; la tabla queda en orden de ejecución.
+        signals.sort(key=operator.attrgetter("time"))
+        tree = self.tree
+        row_signals = self.row_signals
+        row_values = self._row_values
+        insert = tree.insert
+        # Tabla oculta durante la carga masiva: Tk la redibuja una sola vez al volver.
+        tree.grid_remove()
+        try:
+            tree.delete(*tree.get_children())
+            row_signals.clear()
+            for sig in signals:
+                row_signals[insert("", "end", values=row_values(sig))] = sig
+        finally:
+            tree.grid()
+
     def on_tree_click(self, event):
         row_id = self.tree.identify_row(event.y)
         column = self.tree.identify_column(event.x)
@@ -708,9 +1499,7 @@ class BotUI:
             sig.stop_win = win_var.get()
             sig.stop_loss = loss_var.get()
             sig.martingale = mg_var.get()
-            self.tree.set(row_id, "sw", sig.stop_win)
-            self.tree.set(row_id, "sl", sig.stop_loss)
-            self.tree.set(row_id, "mg", "Yes" if sig.martingale else "No")
+            self.tree.item(row_id, values=self._row_values(sig))
             top.destroy()
 
         ttk.Button(top, text="OK", command=save).grid(column=0, row=3, columnspan=2, pady=5)
@@ -718,14 +1507,12 @@ class BotUI:
         self.root.mainloop()
 
 class ConsoleRedirector:
-    def __init__(self, widget):
-        self.widget = widget
+    """Buffer writes from any thread; BotUI._pump_console drains them into Tk."""
+    def __init__(self):
+        self.q = collections.deque(maxlen=CONSOLE_BUFFER_MAX)
 
     def write(self, message):
-        self.widget.configure(state="normal")
-        self.widget.insert("end", message)
-        self.widget.see("end")
-        self.widget.configure(state="disabled")
+        self.q.append(message)  # deque.append es atómico con el GIL
 
     def flush(self):
         pass
@@ -859,7 +1646,9 @@ class ConsoleRedirector:
 #         self.root.mainloop()
 
 if __name__ == "__main__":
-    if tk is None:
+    try:
+        _tk()
+    except ImportError:
         print("Tkinter not available. Exiting.")
     else:
         ui = BotUI()
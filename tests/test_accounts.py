@@ -0,0 +1,70 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from deriv_bot import BotUI
+
+
+class AccountsFileTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        # BotUI sin ventana: solo lo que tocan load/save de cuentas.
+        self.ui = object.__new__(BotUI)
+        self.ui._config_path = self.dir / "keys.jsonl"
+        self.ui.account_combo = {}
+        self.ui.account_var = mock.Mock()
+
+    def lines(self):
+        return [json.loads(line) for line in self.ui._config_path.read_text().splitlines()]
+
+    def test_legacy_keys_json_is_migrated(self):
+        (self.dir / "keys.json").write_text(json.dumps({"demo": "tok1", "real": "tok2"}))
+        self.ui.load_accounts()
+        self.assertEqual(self.ui.accounts, {"demo": "tok1", "real": "tok2"})
+        self.assertEqual(self.lines(), [{"demo": "tok1"}, {"real": "tok2"}])
+        self.assertEqual(self.ui.account_combo["values"], ["demo", "real"])
+        self.ui.account_var.set.assert_called_once_with("demo")
+
+    def test_no_files_creates_an_empty_keys_jsonl(self):
+        self.ui.load_accounts()
+        self.assertEqual(self.ui.accounts, {})
+        self.assertEqual(self.ui._config_path.read_text(), "")
+        self.ui.account_var.set.assert_not_called()
+
+    def test_later_duplicate_name_wins(self):
+        self.ui._config_path.write_text('{"demo":"old"}\n{"real":"tok2"}\n')
+        self.ui.append_account("demo", "new")
+        self.ui.load_accounts()
+        self.assertEqual(self.ui.accounts, {"demo": "new", "real": "tok2"})
+
+    def test_truncated_last_line_is_rewritten_clean(self):
+        self.ui._config_path.write_text('{"demo":"tok1"}\n{"real":"to')
+        self.ui.load_accounts()
+        self.assertEqual(self.ui.accounts, {"demo": "tok1"})
+        self.assertEqual(self.lines(), [{"demo": "tok1"}])
+        # El siguiente append empieza en una línea propia.
+        self.ui.append_account("real", "tok2")
+        self.ui.load_accounts()
+        self.assertEqual(self.ui.accounts, {"demo": "tok1", "real": "tok2"})
+
+    def test_missing_final_newline_is_repaired(self):
+        self.ui._config_path.write_text('{"demo":"tok1"}')
+        self.ui.load_accounts()
+        self.ui.append_account("real", "tok2")
+        self.ui.load_accounts()
+        self.assertEqual(self.ui.accounts, {"demo": "tok1", "real": "tok2"})
+
+    def test_intact_file_is_not_rewritten(self):
+        self.ui._config_path.write_text('{"demo":"tok1"}\n\n')
+        with mock.patch.object(BotUI, "save_accounts") as save:
+            self.ui.load_accounts()
+        save.assert_not_called()
+        self.assertEqual(self.ui.accounts, {"demo": "tok1"})
+
+
+if __name__ == "__main__":
+    unittest.main()
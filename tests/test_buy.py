@@ -0,0 +1,101 @@
+import asyncio
+import json
+import unittest
+
+try:
+    from websockets.asyncio.server import serve
+except ImportError:  # websockets es opcional para el resto de tests
+    serve = None
+
+from deriv_bot import DerivAPI
+
+
+class FakeServer:
+    """Minimal Deriv endpoint: authorizes and answers each buy after ``delay`` seconds."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.buys = []
+
+    async def handler(self, ws):
+        async for raw in ws:
+            req = json.loads(raw)
+            if "authorize" in req:
+                await ws.send(json.dumps({"msg_type": "authorize", "authorize": {}}))
+            elif "buy" in req:
+                self.buys.append(req)
+                asyncio.create_task(self.reply_later(ws, req))
+
+    async def reply_later(self, ws, req):
+        await asyncio.sleep(self.delay)
+        await ws.send(json.dumps({"msg_type": "buy", "req_id": req["req_id"],
+                                  "buy": {"contract_id": 1000 + len(self.buys)}}))
+
+
+class BuyRequestTest(unittest.TestCase):
+    def test_template_formats_into_valid_json(self):
+        template = DerivAPI.buy_request("R_%d%s%%", "put", 5)
+        for amount in (0.35, 1.25, 1e-05, 12.0):
+            with self.subTest(amount=amount):
+                request = json.loads(template % (amount, amount, 77))
+                self.assertEqual(request["price"], amount)
+                self.assertEqual(request["parameters"]["amount"], amount)
+                self.assertEqual(request["parameters"]["symbol"], "R_%d%s%%")
+                self.assertEqual(request["parameters"]["contract_type"], "PUT")
+                self.assertEqual(request["parameters"]["duration"], 5)
+                self.assertEqual(request["req_id"], 77)
+
+
+@unittest.skipIf(serve is None, "websockets is not installed")
+class BuyTest(unittest.IsolatedAsyncioTestCase):
+    async def start(self, delay: float, pool_size: int = 0) -> FakeServer:
+        fake = FakeServer(delay)
+        server = await serve(fake.handler, "127.0.0.1", 0)
+        self.addAsyncCleanup(server.wait_closed)
+        self.addCleanup(server.close)
+        port = server.sockets[0].getsockname()[1]
+        self.api = DerivAPI("token", pool_size=pool_size)
+        self.api.url = f"ws://127.0.0.1:{port}"
+        self.addAsyncCleanup(self.api.close)
+        await self.api.connect()
+        return fake
+
+    async def test_reply_in_time(self):
+        await self.start(delay=0)
+        reply = await self.api.buy(DerivAPI.buy_request("frxEURUSD", "CALL", 1), 1)
+        self.assertEqual(reply["buy"]["contract_id"], 1001)
+
+    async def test_late_reply_is_not_bought_again(self):
+        for pool_size in (0, 1):
+            with self.subTest(pool_size=pool_size):
+                fake = await self.start(delay=0.3, pool_size=pool_size)
+                template = DerivAPI.buy_request("frxEURUSD", "CALL", 1)
+                with self.assertLogs("deriv_bot", "ERROR") as logs:
+                    with self.assertRaisesRegex(RuntimeError, "sin respuesta"):
+                        await self.api.buy(template, 1, timeout=0.1, delay=0)
+                await asyncio.sleep(0.4)  # la respuesta tardía llega y se descarta
+                self.assertEqual(len(fake.buys), 1)
+                self.assertIn("req_id %d" % fake.buys[0]["req_id"], logs.output[0])
+                self.assertEqual(self.api._req_futures, {})
+
+    async def test_failed_send_is_retried(self):
+        fake = await self.start(delay=0)
+        send_buy = self.api._send_buy
+        calls = []
+
+        async def flaky(frame):
+            calls.append(frame)
+            if len(calls) == 1:
+                raise ConnectionResetError("reset")
+            await send_buy(frame)
+
+        self.api._send_buy = flaky
+        with self.assertLogs("deriv_bot", "WARNING"):
+            reply = await self.api.buy(DerivAPI.buy_request("frxEURUSD", "CALL", 1), 1, delay=0)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(len(fake.buys), 1)
+        self.assertEqual(reply["req_id"], fake.buys[0]["req_id"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+
+try:
+    from websockets.asyncio.server import serve
+    from websockets.frames import Frame, Opcode
+except ImportError:  # websockets es opcional para el resto de tests
+    serve = None
+
+from deriv_bot import DEFLATE_MIN_SIZE, DerivAPI
+
+
+@unittest.skipIf(serve is None, "websockets is not installed")
+class DeflateTest(unittest.IsolatedAsyncioTestCase):
+    async def test_negotiated_extension_skips_small_messages(self):
+        async def handler(ws):
+            await ws.recv()  # authorize
+            await ws.send('{"msg_type":"authorize","authorize":{}}')
+            await ws.wait_closed()
+
+        server = await serve(handler, "127.0.0.1", 0)
+        self.addAsyncCleanup(server.wait_closed)
+        self.addCleanup(server.close)
+        api = DerivAPI("token", pool_size=0)
+        api.url = f"ws://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+        ws = await api._connect_one()
+        self.addAsyncCleanup(ws.close)
+
+        [extension] = ws.protocol.extensions
+        self.assertEqual(type(extension).__name__, "SizedPerMessageDeflate")
+        small = Frame(Opcode.TEXT, b"x" * (DEFLATE_MIN_SIZE - 1))
+        self.assertFalse(extension.encode(small).rsv1)
+        large = Frame(Opcode.TEXT, b"x" * DEFLATE_MIN_SIZE)
+        self.assertTrue(extension.encode(large).rsv1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+from datetime import datetime
+
+from deriv_bot import parse_signal, parse_signals
+
+
+class ParseSignalsTest(unittest.TestCase):
+    def test_single_line(self):
+        sig = parse_signal("05/03/2025;14:30;EURUSD;call;m5")
+        self.assertEqual(sig.time, datetime(2025, 3, 5, 14, 30))
+        self.assertEqual((sig.symbol, sig.direction, sig.timeframe), ("frxEURUSD", "CALL", "M5"))
+        self.assertEqual(sig.duration_min, 5)
+        self.assertEqual((sig.date_str, sig.time_str), ("05/03/2025", "14:30"))
+
+    def test_crlf_input(self):
+        text = "05/03/2025;14:30;EURUSD;CALL;M5\r\n05/03/2025;14:35;R_100;PUT;M1\r\n"
+        signals = parse_signals(text)
+        self.assertEqual([s.symbol for s in signals], ["frxEURUSD", "R_100"])
+        self.assertEqual([s.timeframe for s in signals], ["M5", "M1"])
+
+    def test_blank_lines_and_padding_are_skipped(self):
+        text = "\n  05/03/2025 ; 14:30 ; EURUSD ; CALL ; M5  \n\n\t\n5/3/2025;9:05;GBPJPY;PUT;M15\n\n"
+        signals = parse_signals(text)
+        self.assertEqual([s.time for s in signals],
+                         [datetime(2025, 3, 5, 14, 30), datetime(2025, 3, 5, 9, 5)])
+        self.assertEqual(signals[1].time_str, "09:05")
+
+    def test_empty_text(self):
+        self.assertEqual(parse_signals(""), [])
+        self.assertEqual(parse_signals(" \n\r\n"), [])
+
+    def test_bad_line_in_the_middle(self):
+        text = "05/03/2025;14:30;EURUSD;CALL;M5\n05/03/2025;14:35;EURUSD;UP;M5\n05/03/2025;14:40;EURUSD;PUT;M5\n"
+        with self.assertRaisesRegex(ValueError, "14:35;EURUSD;UP"):
+            parse_signals(text)
+
+    def test_timeframe_needs_unit_and_number(self):
+        for timeframe in ("5", "M", "5M"):
+            with self.subTest(timeframe=timeframe):
+                with self.assertRaisesRegex(ValueError, "Invalid signal format: .*;" + timeframe):
+                    parse_signals("05/03/2025;14:30;EURUSD;CALL;" + timeframe)
+
+    def test_trailing_garbage(self):
+        with self.assertRaisesRegex(ValueError, "fin de señales"):
+            parse_signals("05/03/2025;14:30;EURUSD;CALL;M5\nfin de señales")
+        with self.assertRaises(ValueError):
+            parse_signals("05/03/2025;14:30;EURUSD;CALL;M5 extra")
+
+    def test_single_line_keeps_accepting_line_endings(self):
+        for ending in ("\n", "\r\n"):
+            sig = parse_signal("05/03/2025;14:30;EURUSD;CALL;M5" + ending)
+            self.assertEqual((sig.symbol, sig.timeframe), ("frxEURUSD", "M5"))
+
+    def test_single_line_rejects_multiple_lines(self):
+        with self.assertRaises(ValueError):
+            parse_signal("05/03/2025;14:30;EURUSD;CALL;M5\n05/03/2025;14:35;EURUSD;PUT;M5")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import asyncio
+import unittest
+
+from deriv_bot import DerivAPI, _json_loads
+
+
+class WantedTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.api = DerivAPI("token")
+
+    def pending_request(self, req_id: int) -> asyncio.Future:
+        fut = self.api._req_futures[req_id] = asyncio.get_running_loop().create_future()
+        return fut
+
+    async def test_pending_req_id_is_routed(self):
+        fut = self.pending_request(42)
+        raw = b'{"echo_req":{"buy":1,"req_id":42},"buy":{"contract_id":9001},"msg_type":"buy","req_id":42}'
+        self.assertTrue(self.api._wanted(raw))
+        self.api._dispatch(_json_loads(raw))
+        self.assertEqual(fut.result()["buy"]["contract_id"], 9001)
+        self.assertNotIn(42, self.api._req_futures)
+
+    async def test_unknown_req_id_is_dropped(self):
+        self.pending_request(42)
+        self.assertFalse(self.api._wanted(b'{"msg_type":"buy","req_id": 7}'))
+
+    async def test_only_sold_contract_updates_pass(self):
+        queue = self.api._contract_queues[9001] = asyncio.Queue()
+        open_update = (b'{"msg_type":"proposal_open_contract","proposal_open_contract":'
+                       b'{"contract_id":9001,"is_sold":0,"profit":-0.4}}')
+        sold = (b'{"msg_type": "proposal_open_contract", "proposal_open_contract":'
+                b' {"contract_id": 9001, "is_sold": 1, "profit": 0.9}}')
+        self.assertFalse(self.api._wanted(open_update))
+        self.assertTrue(self.api._wanted(sold))
+        self.api._dispatch(_json_loads(sold))
+        self.assertEqual(queue.get_nowait()["proposal_open_contract"]["profit"], 0.9)
+
+    async def test_sold_update_for_another_contract_is_dropped(self):
+        self.api._contract_queues[9001] = asyncio.Queue()
+        raw = (b'{"msg_type":"proposal_open_contract","proposal_open_contract":'
+               b'{"contract_id":1234,"is_sold":1,"profit":0.9}}')
+        self.assertFalse(self.api._wanted(raw))
+
+    async def test_id_digits_inside_a_price_are_ignored(self):
+        self.pending_request(42)
+        self.api._contract_queues[9001] = asyncio.Queue()
+        tick = b'{"msg_type":"tick","tick":{"epoch":1700009001,"quote":1.0842,"symbol":"frxEURUSD"}}'
+        self.assertFalse(self.api._wanted(tick))
+        sold = (b'{"msg_type":"proposal_open_contract","proposal_open_contract":'
+                b'{"bid_price":9001.42,"contract_id":5,"is_sold":1}}')
+        self.assertFalse(self.api._wanted(sold))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+import deriv_bot
+from deriv_bot import DerivBot, Signal
+
+NOW = datetime(2025, 3, 5, 14, 30)
+
+
+class FakeClock:
+    """Stands in for the ``time`` module: every monotonic() read advances one second."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        self.now += 1.0
+        return self.now
+
+    def time(self):
+        return NOW.timestamp()
+
+
+def make_signal(seconds: int, symbol: str = "frxEURUSD") -> Signal:
+    return Signal(time=NOW + timedelta(seconds=seconds), symbol=symbol,
+                  direction="CALL", timeframe="M1")
+
+
+class SchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        for patcher in (mock.patch.object(deriv_bot, "time", self.clock),
+                        mock.patch.object(deriv_bot, "SCHEDULE_TICK", 0.001)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.bot = DerivBot("token", api=mock.Mock())
+        self.fired = []
+
+        async def run_signal(sig):
+            self.fired.append((sig.symbol, self.clock.now))
+
+        self.bot._run_signal = run_signal
+        # Un solo bucle por test: los eventos del bot quedan ligados a él.
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def run_schedule(self):
+        self.bot.running = True
+        self.bot._halted.clear()
+        self.loop.run_until_complete(self.bot._schedule())
+
+    def test_equal_deadlines_keep_arrival_order(self):
+        first, second, third = make_signal(60, "A"), make_signal(60, "B"), make_signal(60, "C")
+        early = make_signal(30, "E")
+        for sig in (first, second, early, third):
+            self.bot.add_signal(sig)
+        self.assertEqual([s.symbol for s in self.bot.signals], ["E", "A", "B", "C"])
+        self.assertEqual(list(self.bot._deadlines), [s.deadline for s in self.bot.signals])
+        self.assertEqual(first.deadline, third.deadline)
+
+    def test_delay_moves_the_deadline(self):
+        bot = DerivBot("token", delay=5, api=mock.Mock())
+        sig = make_signal(60)
+        bot.add_signal(sig)
+        self.assertEqual(sig.deadline, NOW.timestamp() + 60 + bot._clock_offset - 5)
+
+    def test_late_signals_fire_at_once_then_wait_for_the_rest(self):
+        for seconds, symbol in ((-120, "OLD"), (-5, "LATE"), (20, "NEXT")):
+            self.bot.add_signal(make_signal(seconds, symbol))
+        start = self.clock.now
+        self.run_schedule()
+        self.assertEqual([symbol for symbol, _ in self.fired], ["OLD", "LATE", "NEXT"])
+        self.assertLess(self.fired[1][1] - start, 5)
+        self.assertGreaterEqual(self.fired[2][1], self.bot.signals[2].deadline)
+        self.assertEqual(self.bot._cursor, 3)
+        self.assertTrue(all(s.fired for s in self.bot.signals))
+
+    def test_resume_from_cursor_after_halt(self):
+        for seconds, symbol in ((5, "A"), (10, "B"), (15, "C")):
+            self.bot.add_signal(make_signal(seconds, symbol))
+
+        async def halt_after_b(sig):
+            self.fired.append((sig.symbol, self.clock.now))
+            if sig.symbol == "B":
+                self.bot._halt()
+
+        self.bot._run_signal = halt_after_b
+        self.run_schedule()
+        self.assertEqual([symbol for symbol, _ in self.fired], ["A", "B"])
+        self.assertEqual(self.bot._cursor, 2)
+        self.assertEqual([s.fired for s in self.bot.signals], [True, True, False])
+
+        self.run_schedule()
+        self.assertEqual([symbol for symbol, _ in self.fired], ["A", "B", "C"])
+        self.assertEqual(self.bot._cursor, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,29 @@
+import unittest
+
+from deriv_bot import _normalize_symbol
+
+
+class NormalizeSymbolTest(unittest.TestCase):
+    def test_forex_pairs_get_frx_prefix(self):
+        for raw in ("EURUSD", "eurusd", "UsdCad", "XAUUSD"):
+            self.assertEqual(_normalize_symbol(raw), "frx" + raw.upper())
+
+    def test_market_prefix_is_lowercased(self):
+        self.assertEqual(_normalize_symbol("FRXGBPJPY"), "frxGBPJPY")
+        self.assertEqual(_normalize_symbol("frxeurusd"), "frxEURUSD")
+        self.assertEqual(_normalize_symbol("cryETHUSD"), "cryETHUSD")
+        self.assertEqual(_normalize_symbol("stpRNG"), "stpRNG")
+
+    def test_crypto_exceptions(self):
+        self.assertEqual(_normalize_symbol("btcusd"), "cryBTCUSD")
+        self.assertEqual(_normalize_symbol("ETHUSD"), "cryETHUSD")
+
+    def test_indices_pass_through_uppercased(self):
+        for raw, expected in (("R_100", "R_100"), ("r_100", "R_100"),
+                              ("1hz100v", "1HZ100V"), ("WLDAUD", "WLDAUD"),
+                              ("wldusd", "WLDUSD")):
+            self.assertEqual(_normalize_symbol(raw), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()